@@ -34,7 +34,7 @@ class AuditExportTests(APITestCase):
             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
         self.assertIn('filename="audit_logs.xlsx"', response["Content-Disposition"])
-        self.assertTrue(response.content.startswith(b"PK"))
+        self.assertTrue(response.getvalue().startswith(b"PK"))
 
     def test_audit_logs_export_rejects_unsupported_format(self):
         response = self.client.get("/api/audit-logs/export/?file_format=pdf")
@@ -31,3 +31,27 @@ def audit(request, action, entity="", entity_id="", metadata=None, actor=None):
         ip_address=get_client_ip(request) if request else None,
         metadata=metadata or {},
     )
+
+
+def audit_many(request, action, entity="", entries=(), actor=None, batch_size=500):
+    """
+    Bulk variant of ``audit`` for set-based operations.
+    ``entries`` is an iterable of ``(entity_id, metadata)`` pairs; every record
+    shares the same actor, action, entity and ip address.
+    """
+    resolved_actor = actor or (request.user if request and request.user.is_authenticated else None)
+    ip_address = get_client_ip(request) if request else None
+    logs = [
+        AuditLog(
+            actor=resolved_actor,
+            action=action,
+            entity=entity or "",
+            entity_id=str(entity_id) if entity_id else "",
+            ip_address=ip_address,
+            metadata=metadata or {},
+        )
+        for entity_id, metadata in entries
+    ]
+    if logs:
+        AuditLog.objects.bulk_create(logs, batch_size=batch_size)
+    return len(logs)
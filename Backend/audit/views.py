@@ -121,7 +121,7 @@ class AuditLogsExportView(APIView):
             "entity_id",
             "ip_address",
         ]
-        rows = [
+        rows = (
             [
                 log.id,
                 log.created_at.isoformat(),
@@ -132,7 +132,7 @@ class AuditLogsExportView(APIView):
                 log.ip_address or "",
             ]
             for log in qs.iterator(chunk_size=2000)
-        ]
+        )
 
         if export_format == "xlsx":
             audit_export(request, entity="AuditLog", export_format="xlsx")
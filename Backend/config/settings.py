@@ -116,6 +116,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "leaves.middleware.LeaveBalanceMemoMiddleware",
 ]
 
 # Email / Bird
@@ -320,6 +321,7 @@ EMPLOYEE_IMPORT_THROTTLE_RATE = "5/min"
 PAYROLL_FINALIZE_THROTTLE_RATE = "5/min"
 PAYROLL_GENERATE_PAYSLIPS_THROTTLE_RATE = "5/min"
 PAYROLL_EXPORT_THROTTLE_RATE = "10/min"
+PAYROLL_GENERATION_CHUNK_SIZE = int(os.environ.get("PAYROLL_GENERATION_CHUNK_SIZE", "500"))
 # QR labels are signed, company-bound references rather than public asset URLs.
 # Reprint labels before this five-year validity window expires.
 ASSET_LABEL_QR_TOKEN_MAX_AGE_SECONDS = int(os.environ.get("ASSET_LABEL_QR_TOKEN_MAX_AGE_SECONDS", "157680000"))
@@ -1,39 +1,58 @@
 import csv
-import io
 import re
+import tempfile
 
 import openpyxl
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 
 from audit.utils import audit
 
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Workbooks larger than this spill from memory to a temporary file on disk.
+XLSX_SPOOL_MAX_BYTES = 5 * 1024 * 1024
 
-def csv_response(*, rows, headers, filename: str) -> HttpResponse:
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(headers)
+
+class _Echo:
+    """File-like object whose ``write`` hands the formatted line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_csv_lines(rows, headers):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
     for row in rows:
-        writer.writerow(row)
+        yield writer.writerow(row)
+
+
+def csv_response(*, rows, headers, filename: str) -> StreamingHttpResponse:
+    """
+    Streams ``rows`` as CSV without materialising the file. ``rows`` may be any
+    iterable, so callers should pass a generator over ``queryset.iterator()``.
+    """
+    response = StreamingHttpResponse(_iter_csv_lines(rows, headers), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
-def xlsx_response(*, rows, headers, filename: str, sheet_name: str = "Export") -> HttpResponse:
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = sheet_name[:31] or "Export"
-    worksheet.append(headers)
+def xlsx_response(*, rows, headers, filename: str, sheet_name: str = "Export") -> FileResponse:
+    """
+    Writes ``rows`` with openpyxl's write-only mode into a spooled temporary file
+    and streams that file back, so neither the workbook nor its bytes are held
+    in memory as a whole.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_name[:31] or "Export")
+    worksheet.append(list(headers))
     for row in rows:
         worksheet.append(list(row))
 
-    output = io.BytesIO()
+    output = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_BYTES)
     workbook.save(output)
     output.seek(0)
 
-    response = HttpResponse(
-        output.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    response = FileResponse(output, content_type=XLSX_CONTENT_TYPE)
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
@@ -11,6 +11,7 @@ from rest_framework.test import APITestCase
 from assets.models import Asset, AssetReturnRequest
 from attendance.models import AttendanceRecord
 from audit.models import AuditLog
+from core.exporting import csv_response, xlsx_response
 from core.models import DelegationRule, UserPreference
 from core.permissions import get_role, is_department_ceo_approver_user
 from core.responses import error
@@ -175,6 +176,47 @@ class ErrorResponseTests(TestCase):
         self.assertEqual(response.data["errors"][0]["message"], expected)
 
 
+class StreamingExportTests(TestCase):
+    def test_csv_response_streams_rows_from_a_generator(self):
+        consumed = []
+
+        def rows():
+            for index in range(3):
+                consumed.append(index)
+                yield [f"EMP-{index}", "Name, With Comma"]
+
+        response = csv_response(rows=rows(), headers=["employee_id", "name"], filename="export.csv")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(consumed, [])
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="export.csv"')
+        self.assertEqual(
+            response.getvalue().decode(),
+            'employee_id,name\r\nEMP-0,"Name, With Comma"\r\nEMP-1,"Name, With Comma"\r\nEMP-2,"Name, With Comma"\r\n',
+        )
+
+    def test_xlsx_response_streams_write_only_workbook(self):
+        from io import BytesIO
+
+        from openpyxl import load_workbook
+
+        response = xlsx_response(
+            rows=([f"EMP-{index}", index * 1.5] for index in range(3)),
+            headers=["Employee ID", "Amount"],
+            filename="export.xlsx",
+            sheet_name="Payroll",
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="export.xlsx"')
+        workbook = load_workbook(filename=BytesIO(response.getvalue()))
+        self.assertEqual(workbook.sheetnames, ["Payroll"])
+        self.assertEqual(
+            list(workbook.active.iter_rows(values_only=True)),
+            [("Employee ID", "Amount"), ("EMP-0", 0), ("EMP-1", 1.5), ("EMP-2", 3)],
+        )
+
+
 class WorkflowSnapshotTests(TestCase):
     def setUp(self):
         self.user_model = get_user_model()
@@ -742,7 +742,7 @@ class EmployeeProfileTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", response["Content-Type"])
 
-        workbook = load_workbook(filename=BytesIO(response.content))
+        workbook = load_workbook(filename=BytesIO(response.getvalue()))
         worksheet = workbook.active
         rows = list(worksheet.iter_rows(values_only=True))
 
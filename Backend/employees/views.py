@@ -498,7 +498,7 @@ class EmployeeProfileViewSet(viewsets.ModelViewSet):
             "Join Date",
             "Status",
         ]
-        rows = [
+        rows = (
             [
                 profile.employee_id,
                 profile.full_name,
@@ -515,12 +515,12 @@ class EmployeeProfileViewSet(viewsets.ModelViewSet):
                 getattr(profile, "effective_employment_status", profile.employment_status),
             ]
             for profile in qs.iterator(chunk_size=2000)
-        ]
+        )
         audit_export(
             request,
             entity="EmployeeProfile",
             export_format="xlsx",
-            metadata={"count": len(rows)},
+            metadata={"count": qs.count()},
         )
         return xlsx_response(
             headers=headers,
@@ -0,0 +1,12 @@
+from .utils import leave_balance_memo
+
+
+class LeaveBalanceMemoMiddleware:
+    """Scopes the leave balance memo to a single request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with leave_balance_memo():
+            return self.get_response(request)
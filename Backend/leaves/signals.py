@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from employees.models import EmployeeProfile
+
+from .models import LeaveBalanceAdjustment, LeaveRequest, LeaveType
+from .utils import clear_leave_balance_memo
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+@receiver(post_save, sender=LeaveBalanceAdjustment)
+@receiver(post_delete, sender=LeaveBalanceAdjustment)
+@receiver(post_save, sender=LeaveType)
+@receiver(post_delete, sender=LeaveType)
+@receiver(post_save, sender=EmployeeProfile)
+def reset_leave_balance_memo(sender, **kwargs):
+    # Balances memoized earlier in the request may now be stale.
+    clear_leave_balance_memo()
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from employees.models import EmployeeProfile
+from leaves.models import LeaveBalanceAdjustment, LeaveRequest, LeaveType
+from leaves.utils import calculate_leave_balance, leave_balance_memo
+from organization.models import OrganizationNode
+
+User = get_user_model()
+
+
+class LeaveBalanceEngineTests(TestCase):
+    def setUp(self):
+        self.company = OrganizationNode.objects.create(
+            code="BALANCE_ENGINE", name="Balance Engine", node_type=OrganizationNode.NodeType.COMPANY
+        )
+        self.user = User.objects.create_user(email="balance-engine@test.com", password="password")
+        self.profile = EmployeeProfile.objects.create(
+            user=self.user,
+            employee_id="EMP-BAL-ENGINE",
+            hire_date=date(2016, 3, 1),
+            employment_status=EmployeeProfile.EmploymentStatus.ACTIVE,
+            company=self.company,
+        )
+        self.annual = LeaveType.objects.create(
+            company=self.company,
+            name="Annual Leave",
+            code="ANNUAL",
+            annual_quota=Decimal("21.00"),
+            allow_carry_over=True,
+            max_carry_over=Decimal("10.00"),
+        )
+        for year in range(2016, 2026):
+            LeaveRequest.objects.create(
+                employee=self.user,
+                employee_profile=self.profile,
+                company=self.company,
+                leave_type=self.annual,
+                start_date=date(year, 6, 1),
+                end_date=date(year, 6, 3),
+                status=LeaveRequest.RequestStatus.APPROVED,
+            )
+        LeaveBalanceAdjustment.objects.create(
+            employee=self.user,
+            employee_profile=self.profile,
+            leave_type=self.annual,
+            adjustment_days=Decimal("2.50"),
+            reason="Manual top-up",
+        )
+
+    def _annual(self, balances):
+        return next(balance for balance in balances if balance["leave_type_id"] == self.annual.id)
+
+    def test_multi_year_carry_over_is_computed_with_constant_queries(self):
+        calculate_leave_balance(self.user, 2017)  # warm up policy leave types
+        with CaptureQueriesContext(connection) as short_history:
+            calculate_leave_balance(self.user, 2017)
+        with CaptureQueriesContext(connection) as long_history:
+            balances = calculate_leave_balance(self.user, 2026, as_of=date(2026, 1, 31))
+
+        self.assertEqual(len(long_history), len(short_history))
+        annual = self._annual(balances)
+        self.assertEqual(annual["total_days"], 31.0 + annual["adjustments"])
+        self.assertEqual(annual["used_days"], 0.0)
+
+    def test_memo_reuses_results_and_resets_on_writes(self):
+        with leave_balance_memo():
+            first = calculate_leave_balance(self.user, 2025)
+            with CaptureQueriesContext(connection) as repeated:
+                second = calculate_leave_balance(self.user, 2025)
+            self.assertEqual(first, second)
+            self.assertLessEqual(len(repeated), 1)
+
+            LeaveRequest.objects.create(
+                employee=self.user,
+                employee_profile=self.profile,
+                company=self.company,
+                leave_type=self.annual,
+                start_date=date(2025, 9, 1),
+                end_date=date(2025, 9, 1),
+                status=LeaveRequest.RequestStatus.APPROVED,
+            )
+            refreshed = calculate_leave_balance(self.user, 2025)
+
+        self.assertEqual(self._annual(refreshed)["used_days"], self._annual(first)["used_days"] + 1)
@@ -1,7 +1,11 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import date, timedelta
 from decimal import Decimal
 
 from django.db.models import Q, Sum
+from django.utils import timezone
 
 from employees.models import EmployeeProfile
 
@@ -334,19 +338,22 @@ def get_used_days_for_type(user, leave_type: LeaveType, year: int, as_of: date |
     return float(used)
 
 
-def get_adjustments_for_type(user, leave_type: LeaveType, year: int):
-    profile = resolve_employee_profile(user)
-    adjustments = LeaveBalanceAdjustment.objects.none()
+def leave_adjustment_employee_filter(employee_subject):
+    profile = resolve_employee_profile(employee_subject)
     if profile:
         if profile.user_id:
-            adjustments = LeaveBalanceAdjustment.objects.filter(
+            return LeaveBalanceAdjustment.objects.filter(
                 employee=profile.user
             ) | LeaveBalanceAdjustment.objects.filter(employee_profile=profile)
-        else:
-            adjustments = LeaveBalanceAdjustment.objects.filter(employee_profile=profile)
-    elif user:
-        adjustments = LeaveBalanceAdjustment.objects.filter(employee=user)
-    else:
+        return LeaveBalanceAdjustment.objects.filter(employee_profile=profile)
+    if employee_subject:
+        return LeaveBalanceAdjustment.objects.filter(employee=employee_subject)
+    return None
+
+
+def get_adjustments_for_type(user, leave_type: LeaveType, year: int):
+    adjustments = leave_adjustment_employee_filter(user)
+    if adjustments is None:
         return 0.0
 
     adjs = adjustments.filter(leave_type=leave_type, created_at__year=year).aggregate(Sum("adjustment_days"))[
@@ -539,104 +546,135 @@ def validate_leave_request_policy(
     return None
 
 
-def calculate_leave_balance(user, year, profile=None, as_of: date | None = None):
+_leave_balance_memo: ContextVar[dict | None] = ContextVar("leave_balance_memo", default=None)
+
+
+@contextmanager
+def leave_balance_memo():
     """
-    Calculate balances for all leave types for a user in a given year.
-    Returns a list of dicts.
+    Memoize ``calculate_leave_balance`` results per (employee, year, as_of) for the
+    duration of the block. LeaveBalanceMemoMiddleware opens one per request.
     """
-    # 1. Try to get hire date for recursion base case
-    if not profile:
-        profile = resolve_employee_profile(user)
-    employee_subject = profile or user
+    token = _leave_balance_memo.set({})
+    try:
+        yield
+    finally:
+        _leave_balance_memo.reset(token)
 
-    if profile:
-        hire_year = profile.hire_date.year if profile.hire_date else year
-    else:
-        hire_year = year
 
-    if year < hire_year:
-        return []  # No balances before hire
+def clear_leave_balance_memo():
+    memo = _leave_balance_memo.get()
+    if memo is not None:
+        memo.clear()
+
+
+def _balance_subject_key(employee_subject):
+    if isinstance(employee_subject, EmployeeProfile):
+        return ("profile", employee_subject.pk)
+    return ("user", getattr(employee_subject, "pk", None))
+
+
+def _local_year(value) -> int:
+    if timezone.is_aware(value):
+        return timezone.localtime(value).year
+    return value.year
+
+
+class LeaveHistory:
+    """
+    Approved leave requests and balance adjustments of one employee, fetched in
+    two queries and grouped by leave type so every year can be computed in memory.
+    Mirrors ``get_used_days_for_type``/``get_adjustments_for_type`` exactly.
+    """
+
+    def __init__(self, employee_subject):
+        self.requests_by_type = defaultdict(list)
+        self.adjustments_by_type_year = defaultdict(lambda: Decimal("0"))
+
+        requests = leave_request_employee_filter(employee_subject)
+        if requests is not None:
+            approved = requests.filter(status=LeaveRequest.RequestStatus.APPROVED).values_list(
+                "leave_type_id", "start_date", "end_date"
+            )
+            for leave_type_id, start_date, end_date in approved:
+                self.requests_by_type[leave_type_id].append((start_date, end_date))
+
+        adjustments = leave_adjustment_employee_filter(employee_subject)
+        if adjustments is not None:
+            for leave_type_id, created_at, adjustment_days in adjustments.values_list(
+                "leave_type_id", "created_at", "adjustment_days"
+            ):
+                self.adjustments_by_type_year[(leave_type_id, _local_year(created_at))] += adjustment_days or 0
+
+    def used_days(self, leave_type_id, year: int, as_of: date | None = None) -> float:
+        year_start = date(year, 1, 1)
+        year_end = date(year, 12, 31)
+        used = 0
+        for start_date, end_date in self.requests_by_type.get(leave_type_id, ()):
+            if start_date > year_end or end_date < year_start:
+                continue
+            request_end = min(end_date, as_of) if as_of else end_date
+            if request_end >= start_date:
+                used += calculate_overlap_days(start_date, request_end, year)
+        return float(used)
+
+    def adjustment_days(self, leave_type_id, year: int) -> float:
+        return float(self.adjustments_by_type_year.get((leave_type_id, year), Decimal("0")))
+
+    def has_approved(self, leave_type_id) -> bool:
+        return bool(self.requests_by_type.get(leave_type_id))
+
+
+def _leave_type_quota(leave_type: LeaveType, code: str, profile: EmployeeProfile | None, year: int) -> float:
+    configured_quota = float(leave_type.annual_quota or 0.0)
+    if _is_annual(code):
+        return (
+            configured_quota if configured_quota > 0 else (get_annual_entitlement(profile, year) if profile else 0.0)
+        )
+    if _is_sick(code):
+        return configured_quota if configured_quota > 0 else float(SICK_MAX_DAYS_PER_YEAR)
+    if _is_emergency(code):
+        return configured_quota if configured_quota > 0 else float(EMERGENCY_MAX_DAYS_PER_YEAR)
+    if _is_unpaid(code):
+        return configured_quota if configured_quota > 0 else float(UNPAID_MAX_DAYS_PER_YEAR)
+    if _is_marriage(code):
+        return configured_quota if configured_quota > 0 else float(MARRIAGE_MAX_DAYS)
+    if _is_death(code):
+        return configured_quota if configured_quota > 0 else float(DEATH_MAX_DAYS)
+    if _is_birth(code):
+        return configured_quota if configured_quota > 0 else float(BIRTH_MAX_DAYS)
+    return configured_quota
 
-    if profile and profile.company_id:
-        ensure_policy_leave_types_for_company(profile.company)
-    else:
-        ensure_policy_leave_types()
-    leave_types = _get_balance_leave_types(profile)
-    balances = []
 
+def _year_leave_balances(profile, leave_types, history: LeaveHistory, year: int, as_of, previous_balances):
+    """
+    Balances of a single year. ``previous_balances`` holds the prior year's
+    result (or ``None`` in the hire year) and feeds carry-over openings.
+    """
+    balances = []
     balance_date = as_of or date(year, 12, 31)
+    previous_remaining = {
+        balance["leave_type_id"]: float(balance["remaining_days"]) for balance in previous_balances or []
+    }
 
     for lt in leave_types:
         code = _normalized_leave_code(lt)
-        used = get_used_days_for_type(employee_subject, lt, year, as_of=balance_date)
+        used = history.used_days(lt.id, year, as_of=balance_date)
 
-        # Opening Balance (Carry-over)
+        # Opening Balance (Carry-over) from the previous year's remaining days.
         opening = 0.0
-        if lt.allow_carry_over:
-            # Check for snapshot first (MVP optimization/persistence)
-            # For now, we compute dynamically as per prompt "Snapshots can be recomputed on demand"
-            # But creating a snapshot would be good.
-            # We strictly follow "compute previous year remaining" if no snapshot.
-
-            # Base case: if year == hire_year, opening is 0 (unless we migrated data, but assume 0)
-            if year > hire_year:
-                # Recurse for previous year
-                prev_year = year - 1
-                prev_balances = calculate_leave_balance(employee_subject, prev_year, profile=profile)
-
-                # Extract remaining from previous year's calculation
-                # prev_balances is a list of dicts, find the matching leave_type
-                prev_remaining = 0.0
-                for bal in prev_balances:
-                    if bal["leave_type_id"] == lt.id:
-                        prev_remaining = float(bal["remaining_days"])
-                        break
-
-                # Apply max_carry_over
-                if lt.max_carry_over is not None:
-                    # Convert Decimal to float for comparison if needed, or stick to one type
-                    opening = min(prev_remaining, float(lt.max_carry_over))
-                else:
-                    opening = prev_remaining
-
-        # Quota
+        if lt.allow_carry_over and previous_balances is not None:
+            prev_remaining = previous_remaining.get(lt.id, 0.0)
+            if lt.max_carry_over is not None:
+                opening = min(prev_remaining, float(lt.max_carry_over))
+            else:
+                opening = prev_remaining
+
+        quota = _leave_type_quota(lt, code, profile, year)
         configured_quota = float(lt.annual_quota or 0.0)
-        if _is_annual(code):
-            quota = (
-                configured_quota
-                if configured_quota > 0
-                else (get_annual_entitlement(profile, year) if profile else 0.0)
-            )
-        elif _is_sick(code):
-            quota = configured_quota if configured_quota > 0 else float(SICK_MAX_DAYS_PER_YEAR)
-        elif _is_emergency(code):
-            quota = configured_quota if configured_quota > 0 else float(EMERGENCY_MAX_DAYS_PER_YEAR)
-        elif _is_unpaid(code):
-            quota = configured_quota if configured_quota > 0 else float(UNPAID_MAX_DAYS_PER_YEAR)
-        elif _is_marriage(code):
-            quota = configured_quota if configured_quota > 0 else float(MARRIAGE_MAX_DAYS)
-        elif _is_death(code):
-            quota = configured_quota if configured_quota > 0 else float(DEATH_MAX_DAYS)
-        elif _is_birth(code):
-            quota = configured_quota if configured_quota > 0 else float(BIRTH_MAX_DAYS)
-        else:
-            quota = configured_quota
-
-        # Adjustments
-        # Sum all adjustments for this employee + leave_type (ignoring year/date? usually adjustments span across or tied to year?)
-        # For simplicity, adjustments are time-independent or should strictly apply to current year context?
-        # Usually manual adjustments are "add 5 days now".
-        # If we use recursion for carry-over, an adjustment in prev_year should affect carry-over.
-        # But `calculate_leave_balance` is year-specific.
-        # Ideally, Adjustment model should have a `effective_date` or `year` field to scope it.
-        # I didn't add `year` or `date` to Adjustment model, just `created_at`.
-        # Let's assume adjustments made within the year apply to that year.
-
-        # NOTE: I missed adding `effective_date` to model, defaulting to `created_at` logic.
-        # Filter adjustments created in this year? Or valid for this year?
-        # Let's use created_at.year == year for now.
-
-        adjustments = get_adjustments_for_type(employee_subject, lt, year)
+
+        # Adjustments apply to the calendar year they were recorded in (created_at).
+        adjustments = history.adjustment_days(lt.id, year)
 
         available_annual_year_days = None
         if _is_annual(code):
@@ -654,8 +692,8 @@ def calculate_leave_balance(user, year, profile=None, as_of: date | None = None)
             if annual_type:
                 annual_total = (
                     get_annual_accrued_days(profile, year, as_of=balance_date) if profile else 0.0
-                ) + get_adjustments_for_type(employee_subject, annual_type, year)
-                annual_used = get_used_days_for_type(employee_subject, annual_type, year, as_of=balance_date)
+                ) + history.adjustment_days(annual_type.id, year)
+                annual_used = history.used_days(annual_type.id, year, as_of=balance_date)
                 emergency_used = used
                 annual_remaining_after_annual = max(0.0, annual_total - annual_used)
                 emergency_available_days = min(
@@ -663,17 +701,8 @@ def calculate_leave_balance(user, year, profile=None, as_of: date | None = None)
                 )
 
         # Marriage leave is once during service.
-        if _is_marriage(code):
-            approved_lifetime_qs = leave_request_employee_filter(employee_subject)
-            approved_lifetime = bool(
-                approved_lifetime_qs
-                and approved_lifetime_qs.filter(
-                    leave_type=lt,
-                    status=LeaveRequest.RequestStatus.APPROVED,
-                ).exists()
-            )
-            if approved_lifetime:
-                quota = 0.0
+        if _is_marriage(code) and history.has_approved(lt.id):
+            quota = 0.0
 
         available_total = opening + quota + adjustments
         if available_annual_year_days is not None:
@@ -711,3 +740,55 @@ def calculate_leave_balance(user, year, profile=None, as_of: date | None = None)
         )
 
     return balances
+
+
+def calculate_leave_balance(user, year, profile=None, as_of: date | None = None):
+    """
+    Calculate balances for all leave types for a user in a given year.
+    Returns a list of dicts.
+
+    Carry-over years are computed bottom-up from the hire year from a single
+    LeaveHistory fetch, and results are memoized inside ``leave_balance_memo``.
+    """
+    if not profile:
+        profile = resolve_employee_profile(user)
+    employee_subject = profile or user
+
+    if profile:
+        hire_year = profile.hire_date.year if profile.hire_date else year
+    else:
+        hire_year = year
+
+    if year < hire_year:
+        return []  # No balances before hire
+
+    memo = _leave_balance_memo.get()
+    subject_key = _balance_subject_key(employee_subject)
+    if memo is not None and (subject_key, year, as_of) in memo:
+        return [dict(balance) for balance in memo[(subject_key, year, as_of)]]
+
+    if profile and profile.company_id:
+        ensure_policy_leave_types_for_company(profile.company)
+    else:
+        ensure_policy_leave_types()
+    leave_types = _get_balance_leave_types(profile)
+    history = LeaveHistory(employee_subject)
+
+    previous_balances = None
+    if year > hire_year and any(lt.allow_carry_over for lt in leave_types):
+        for history_year in range(hire_year, year):
+            cached = memo.get((subject_key, history_year, None)) if memo is not None else None
+            if cached is not None:
+                previous_balances = cached
+                continue
+            previous_balances = _year_leave_balances(
+                profile, leave_types, history, history_year, None, previous_balances
+            )
+            if memo is not None:
+                memo[(subject_key, history_year, None)] = previous_balances
+
+    balances = _year_leave_balances(profile, leave_types, history, year, as_of, previous_balances)
+    if memo is not None:
+        memo[(subject_key, year, as_of)] = balances
+        return [dict(balance) for balance in balances]
+    return balances
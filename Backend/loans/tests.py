@@ -564,7 +564,7 @@ class LoanWorkflowTests(APITestCase):
         self.assertEqual(request_obj.status, LoanRequest.RequestStatus.PENDING_MANAGER)
 
     def test_payroll_deducts_open_loan_when_target_month_is_due(self):
-        from payroll.views import _generate_payroll_items
+        from payroll.services import generate_payroll_items
 
         run = PayrollRun.objects.create(year=2026, month=2)
         loan = LoanRequest.objects.create(
@@ -576,13 +576,13 @@ class LoanWorkflowTests(APITestCase):
             target_deduction_year=2026,
             target_deduction_month=1,
         )
-        _generate_payroll_items(run)
+        generate_payroll_items(run)
         loan.refresh_from_db()
         self.assertEqual(loan.status, LoanRequest.RequestStatus.DEDUCTED)
         self.assertEqual(loan.deduction_payroll_run_id, run.id)
 
     def test_payroll_does_not_deduct_open_loan_before_target_month(self):
-        from payroll.views import _generate_payroll_items
+        from payroll.services import generate_payroll_items
 
         run = PayrollRun.objects.create(year=2026, month=2)
         loan = LoanRequest.objects.create(
@@ -594,7 +594,75 @@ class LoanWorkflowTests(APITestCase):
             target_deduction_year=2026,
             target_deduction_month=3,
         )
-        _generate_payroll_items(run)
+        generate_payroll_items(run)
         loan.refresh_from_db()
         self.assertEqual(loan.status, LoanRequest.RequestStatus.APPROVED)
         self.assertIsNone(loan.deduction_payroll_run_id)
+
+    def test_payroll_deducts_only_oldest_due_loan_per_employee(self):
+        from payroll.models import PayrollRunItem
+        from payroll.services import generate_payroll_items
+
+        run = PayrollRun.objects.create(year=2026, month=2)
+        older = LoanRequest.objects.create(
+            employee=self.employee,
+            employee_profile=self.employee_profile,
+            requested_amount=Decimal("300.00"),
+            approved_amount=Decimal("250.00"),
+            status=LoanRequest.RequestStatus.APPROVED,
+            target_deduction_year=2025,
+            target_deduction_month=12,
+        )
+        newer = LoanRequest.objects.create(
+            employee=self.employee,
+            employee_profile=self.employee_profile,
+            requested_amount=Decimal("500.00"),
+            approved_amount=Decimal("500.00"),
+            status=LoanRequest.RequestStatus.APPROVED,
+            target_deduction_year=2026,
+            target_deduction_month=1,
+        )
+        generate_payroll_items(run)
+        older.refresh_from_db()
+        newer.refresh_from_db()
+        self.assertEqual(older.status, LoanRequest.RequestStatus.DEDUCTED)
+        self.assertEqual(older.deducted_amount, Decimal("250.00"))
+        self.assertEqual(newer.status, LoanRequest.RequestStatus.APPROVED)
+        item = PayrollRunItem.objects.get(payroll_run=run, employee_id=self.employee_profile.employee_id)
+        self.assertEqual(item.total_deductions, Decimal("250.00"))
+
+    def test_payroll_generation_query_count_does_not_grow_with_headcount(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from payroll.services import generate_payroll_items
+
+        def _queries_for_run(month):
+            run = PayrollRun.objects.create(year=2026, month=month)
+            with CaptureQueriesContext(connection) as ctx:
+                generate_payroll_items(run)
+            return len(ctx.captured_queries)
+
+        LoanRequest.objects.create(
+            employee=self.employee,
+            employee_profile=self.employee_profile,
+            requested_amount=Decimal("100.00"),
+            approved_amount=Decimal("100.00"),
+            status=LoanRequest.RequestStatus.APPROVED,
+        )
+        baseline = _queries_for_run(3)
+        for index in range(5):
+            user = User.objects.create_user(email=f"payroll-bulk-{index}@ffi.test", password="password")
+            profile = EmployeeProfile.objects.create(
+                user=user,
+                employee_id=f"EMP-PAYROLL-BULK-{index}",
+                full_name=f"Payroll Bulk {index}",
+            )
+            LoanRequest.objects.create(
+                employee=user,
+                employee_profile=profile,
+                requested_amount=Decimal("100.00"),
+                approved_amount=Decimal("100.00"),
+                status=LoanRequest.RequestStatus.APPROVED,
+            )
+        self.assertEqual(_queries_for_run(4), baseline)
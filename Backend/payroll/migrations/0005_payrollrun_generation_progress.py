@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payroll", "0004_remove_payrollrun_unique_payroll_run_period_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payrollrun",
+            name="generation_error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="payrollrun",
+            name="generation_processed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="payrollrun",
+            name="generation_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="payrollrun",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("GENERATING", "Generating"),
+                    ("FAILED", "Failed"),
+                    ("DRAFT", "Draft"),
+                    ("COMPLETED", "Completed"),
+                    ("PAID", "Paid"),
+                    ("CANCELLED", "Cancelled"),
+                ],
+                default="DRAFT",
+                max_length=20,
+            ),
+        ),
+    ]
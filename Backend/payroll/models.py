@@ -7,6 +7,8 @@ from organization.models import OrganizationNode
 
 class PayrollRun(models.Model):
     class Status(models.TextChoices):
+        GENERATING = "GENERATING", _("Generating")
+        FAILED = "FAILED", _("Failed")
         DRAFT = "DRAFT", _("Draft")
         COMPLETED = "COMPLETED", _("Completed")
         PAID = "PAID", _("Paid")
@@ -28,6 +30,10 @@ class PayrollRun(models.Model):
     )
     total_net = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_employees = models.PositiveIntegerField(default=0)
+    # Progress of asynchronous generation (see payroll.tasks.generate_payroll_run_chunk).
+    generation_total = models.PositiveIntegerField(default=0)
+    generation_processed = models.PositiveIntegerField(default=0)
+    generation_error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -23,8 +23,11 @@ class PayrollRunSerializer(serializers.ModelSerializer):
 
 
 class PayrollRunCreateSerializer(PayrollRunSerializer):
+    # "async" creates the run in GENERATING state and builds items on a Celery worker.
+    mode = serializers.ChoiceField(choices=["sync", "async"], default="sync", write_only=True)
+
     class Meta(PayrollRunSerializer.Meta):
-        fields = ["year", "month"]
+        fields = ["year", "month", "mode"]
 
 
 class PayrollRunItemSerializer(serializers.ModelSerializer):
@@ -0,0 +1,266 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from audit.utils import audit_many
+
+from .models import PayrollRun, PayrollRunItem, Payslip
+
+PAYROLL_BULK_BATCH_SIZE = 500
+
+
+def _generation_chunk_size() -> int:
+    return max(1, int(getattr(settings, "PAYROLL_GENERATION_CHUNK_SIZE", 500)))
+
+
+def payroll_employees_queryset(run):
+    from employees.models import EmployeeProfile
+
+    return EmployeeProfile.objects.filter(
+        employment_status=EmployeeProfile.EmploymentStatus.ACTIVE,
+        is_archived=False,
+        company=run.company,
+    )
+
+
+def _due_loans_by_user(run, user_ids):
+    """
+    Locks every loan due for this run in a single query and keeps the oldest
+    due loan per employee user.
+
+    Open-loan deduction policy:
+    - Deduct in current payroll month target.
+    - If target month was missed, deduct in the next available run (overdue carry-forward).
+    """
+    from loans.models import LoanRequest
+
+    due_for_run_q = (
+        Q(target_deduction_year__lt=run.year)
+        | Q(target_deduction_year=run.year, target_deduction_month__lte=run.month)
+        | Q(target_deduction_year__isnull=True, target_deduction_month__isnull=True)
+    )
+    due_loans = (
+        LoanRequest.objects.select_for_update()
+        .filter(
+            employee_id__in=user_ids,
+            status=LoanRequest.RequestStatus.APPROVED,
+            deduction_payroll_run__isnull=True,
+            is_active=True,
+        )
+        .filter(due_for_run_q)
+        .order_by("employee_id", "target_deduction_year", "target_deduction_month", "created_at")
+    )
+    loans_by_user = {}
+    for loan in due_loans:
+        loans_by_user.setdefault(loan.employee_id, loan)
+    return loans_by_user
+
+
+def _write_payroll_items(run, employees, user_ids, request=None, actor=None):
+    """
+    Builds and persists PayrollRunItems, Payslips and loan deductions for
+    ``employees``. Returns ``(count, total_net)`` for the written rows.
+    """
+    from loans.models import LoanRequest
+
+    loans_by_user = _due_loans_by_user(run, user_ids)
+
+    items_to_create = []
+    payslips_to_create = []
+    loans_to_update = []
+
+    total_net = Decimal(0)
+    count = 0
+    deducted_at = timezone.now()
+
+    for emp in employees:
+        # 1. Calculate components
+        basic = emp.basic_salary or Decimal(0)
+        transport = emp.transportation_allowance or Decimal(0)
+        accommodation = emp.accommodation_allowance or Decimal(0)
+        telephone = emp.telephone_allowance or Decimal(0)
+        petrol = emp.petrol_allowance or Decimal(0)
+        other = emp.other_allowance or Decimal(0)
+
+        total_allowances = transport + accommodation + telephone + petrol + other
+        gross_salary = basic + total_allowances
+
+        total_deductions = Decimal(0)
+        loan_to_deduct = loans_by_user.get(emp.user_id) if emp.user_id else None
+        if loan_to_deduct:
+            deduction_amount = loan_to_deduct.approved_amount or loan_to_deduct.requested_amount
+            total_deductions += deduction_amount
+
+            loan_to_deduct.deduction_payroll_run = run
+            loan_to_deduct.deducted_at = deducted_at
+            loan_to_deduct.deducted_amount = deduction_amount
+            loan_to_deduct.status = LoanRequest.RequestStatus.DEDUCTED
+            loan_to_deduct.updated_at = deducted_at
+            loans_to_update.append(loan_to_deduct)
+
+        net_salary = gross_salary - total_deductions
+
+        # 2. Create Run Item
+        items_to_create.append(
+            PayrollRunItem(
+                payroll_run=run,
+                employee_id=emp.employee_id,
+                employee_name=emp.full_name,
+                department=emp.department or "",
+                position=emp.job_title or "",
+                basic_salary=basic,
+                total_allowances=total_allowances,
+                total_deductions=total_deductions,
+                net_salary=net_salary,
+            )
+        )
+
+        # 3. Create Payslip (if user linked)
+        if emp.user_id:
+            payslips_to_create.append(
+                Payslip(
+                    employee_id=emp.user_id,
+                    payroll_run=run,
+                    year=run.year,
+                    month=run.month,
+                    basic_salary=basic,
+                    transportation_allowance=transport,
+                    accommodation_allowance=accommodation,
+                    telephone_allowance=telephone,
+                    petrol_allowance=petrol,
+                    other_allowance=other,
+                    total_salary=gross_salary,
+                    total_deductions=total_deductions,
+                    net_salary=net_salary,
+                    payment_mode="Bank Transfer",  # Default
+                    status="PAID",  # Default for now
+                    is_active=True,
+                )
+            )
+
+        total_net += net_salary
+        count += 1
+
+    # 4. Persist deducted loan state and bulk create items/payslips
+    if loans_to_update:
+        LoanRequest.objects.bulk_update(
+            loans_to_update,
+            ["deduction_payroll_run", "deducted_at", "deducted_amount", "status", "updated_at"],
+            batch_size=PAYROLL_BULK_BATCH_SIZE,
+        )
+        if request or actor:
+            audit_many(
+                request,
+                "loan_deducted_in_payroll",
+                entity="LoanRequest",
+                entries=(
+                    (loan.id, {"payroll_run_id": run.id, "amount": str(loan.deducted_amount)})
+                    for loan in loans_to_update
+                ),
+                actor=actor,
+            )
+    PayrollRunItem.objects.bulk_create(items_to_create, batch_size=PAYROLL_BULK_BATCH_SIZE)
+    Payslip.objects.bulk_create(payslips_to_create, batch_size=PAYROLL_BULK_BATCH_SIZE)
+    return count, total_net
+
+
+def generate_payroll_items(run, request=None):
+    """
+    Generates PayrollRunItems and Payslips for all active employees.
+    Calculates totals and updates the PayrollRun.
+
+    Set-based: due loans are locked in one query and all writes are batched,
+    so the number of queries does not grow with headcount.
+    """
+    employees = payroll_employees_queryset(run)
+    count, total_net = _write_payroll_items(
+        run,
+        employees,
+        employees.filter(user__isnull=False).values("user_id"),
+        request=request,
+    )
+
+    # Update Run Totals
+    run.total_net = total_net
+    run.total_employees = count
+    run.save(update_fields=["total_net", "total_employees"])
+
+
+def generate_payroll_chunk(run_id, after_employee_id="", actor=None):
+    """
+    Processes the next chunk of employees (ordered by ``employee_id``) for an
+    asynchronously generated run and returns the last employee_id handled, or
+    ``None`` once the run is complete.
+
+    Each chunk commits atomically together with its progress counter, and
+    employees that already have an item in the run are skipped, so replaying a
+    chunk after a worker crash never deducts a loan twice.
+    """
+    with transaction.atomic():
+        run = PayrollRun.objects.select_for_update().filter(pk=run_id).first()
+        if run is None or run.status != PayrollRun.Status.GENERATING:
+            return None
+
+        employees = list(
+            payroll_employees_queryset(run)
+            .filter(employee_id__gt=after_employee_id)
+            .order_by("employee_id")[: _generation_chunk_size()]
+        )
+        if not employees:
+            _complete_generation(run)
+            return None
+
+        already_generated = set(
+            PayrollRunItem.objects.filter(
+                payroll_run=run,
+                employee_id__in=[emp.employee_id for emp in employees],
+            ).values_list("employee_id", flat=True)
+        )
+        pending = [emp for emp in employees if emp.employee_id not in already_generated]
+        if pending:
+            _write_payroll_items(
+                run,
+                pending,
+                [emp.user_id for emp in pending if emp.user_id],
+                actor=actor,
+            )
+
+        run.generation_processed = PayrollRunItem.objects.filter(payroll_run=run).count()
+        run.save(update_fields=["generation_processed", "updated_at"])
+        return employees[-1].employee_id
+
+
+def _complete_generation(run):
+    net_values = PayrollRunItem.objects.filter(payroll_run=run).order_by("id").values_list("net_salary", flat=True)
+    total_net = Decimal(0)
+    count = 0
+    for net_salary in net_values.iterator(chunk_size=2000):
+        total_net += net_salary
+        count += 1
+
+    run.total_net = total_net
+    run.total_employees = count
+    run.generation_processed = count
+    run.generation_total = max(run.generation_total, count)
+    run.status = PayrollRun.Status.DRAFT
+    run.save(
+        update_fields=[
+            "total_net",
+            "total_employees",
+            "generation_processed",
+            "generation_total",
+            "status",
+            "updated_at",
+        ]
+    )
+
+
+def mark_generation_failed(run_id, error_message):
+    PayrollRun.objects.filter(pk=run_id, status=PayrollRun.Status.GENERATING).update(
+        status=PayrollRun.Status.FAILED,
+        generation_error=str(error_message or "")[:500],
+        updated_at=timezone.now(),
+    )
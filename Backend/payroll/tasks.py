@@ -0,0 +1,36 @@
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from .services import generate_payroll_chunk, mark_generation_failed
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=3)
+def generate_payroll_run_chunk(self, run_id: int, after_employee_id: str = "", actor_id: int | None = None):
+    """
+    Generate one chunk of a payroll run and queue the next one.
+
+    Chunks are idempotent (see ``generate_payroll_chunk``), so a retried or
+    redelivered task simply resumes where the last committed chunk stopped.
+    """
+    actor = get_user_model().objects.filter(pk=actor_id).first() if actor_id else None
+    try:
+        last_employee_id = generate_payroll_chunk(run_id, after_employee_id=after_employee_id, actor=actor)
+        if last_employee_id is not None:
+            generate_payroll_run_chunk.apply_async(
+                args=[run_id],
+                kwargs={"after_employee_id": last_employee_id, "actor_id": actor_id},
+            )
+    except Exception as exc:
+        logger.exception("payroll_generation_chunk_failed", extra={"payroll_run_id": run_id})
+        if self.request.retries >= self.max_retries:
+            mark_generation_failed(run_id, exc)
+            return {"run_id": run_id, "status": "failed"}
+        raise self.retry(exc=exc, countdown=2 ** (self.request.retries + 1))
+
+    if last_employee_id is None:
+        return {"run_id": run_id, "status": "completed"}
+    return {"run_id": run_id, "status": "generating", "after_employee_id": last_employee_id}
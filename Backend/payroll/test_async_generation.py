@@ -0,0 +1,153 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from employees.models import EmployeeProfile
+from loans.models import LoanRequest
+from organization.models import OrganizationNode
+
+from .models import PayrollRun, PayrollRunItem, Payslip
+from .services import generate_payroll_chunk, generate_payroll_items
+
+User = get_user_model()
+
+ITEM_FIELDS = [
+    "employee_id",
+    "employee_name",
+    "department",
+    "position",
+    "basic_salary",
+    "total_allowances",
+    "total_deductions",
+    "net_salary",
+]
+
+
+@override_settings(PAYROLL_GENERATION_CHUNK_SIZE=2)
+class AsyncPayrollGenerationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        admin_group, _ = Group.objects.get_or_create(name="SystemAdmin")
+        self.admin = User.objects.create_user(email="payroll-async-admin@test.com", password="password")
+        self.admin.groups.add(admin_group)
+        self.company = OrganizationNode.objects.create(
+            code="PAYROLL_ASYNC", name="Payroll Async", node_type=OrganizationNode.NodeType.COMPANY
+        )
+        self.loans = []
+        for index in range(5):
+            user = User.objects.create_user(email=f"payroll-async-{index}@test.com", password="password")
+            profile = EmployeeProfile.objects.create(
+                user=user,
+                company=self.company,
+                employee_id=f"PAY-ASYNC-{index}",
+                full_name=f"Async Employee {index}",
+                employment_status=EmployeeProfile.EmploymentStatus.ACTIVE,
+                basic_salary=Decimal("1000.00") + index,
+                transportation_allowance=Decimal("150.50"),
+            )
+            if index % 2 == 0:
+                self.loans.append(
+                    LoanRequest.objects.create(
+                        employee=user,
+                        employee_profile=profile,
+                        company=self.company,
+                        requested_amount=Decimal("200.00"),
+                        approved_amount=Decimal("120.25"),
+                        status=LoanRequest.RequestStatus.APPROVED,
+                    )
+                )
+
+    def _run_all_chunks(self, run):
+        after = ""
+        while after is not None:
+            after = generate_payroll_chunk(run.id, after_employee_id=after)
+
+    def _create_async_run(self):
+        self.client.force_authenticate(self.admin)
+        with patch("payroll.views.generate_payroll_run_chunk.apply_async") as apply_async:
+            response = self.client.post(
+                "/payroll-runs/",
+                {"year": 2026, "month": 5, "mode": "async"},
+                format="json",
+                HTTP_X_ACTIVE_COMPANY_ID=str(self.company.id),
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        apply_async.assert_called_once()
+        return PayrollRun.objects.get(pk=response.data["data"]["id"])
+
+    def test_async_create_queues_generation_and_reports_progress(self):
+        run = self._create_async_run()
+        self.assertEqual(run.status, PayrollRun.Status.GENERATING)
+        self.assertEqual(run.generation_total, 5)
+        self.assertFalse(PayrollRunItem.objects.filter(payroll_run=run).exists())
+
+        generate_payroll_chunk(run.id)
+        progress = self.client.get(f"/payroll-runs/{run.id}/progress/", HTTP_X_ACTIVE_COMPANY_ID=str(self.company.id))
+
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.data["data"]["status"], PayrollRun.Status.GENERATING)
+        self.assertEqual(progress.data["data"]["processed"], 2)
+        self.assertEqual(progress.data["data"]["total"], 5)
+
+        finalize = self.client.post(
+            f"/payroll-runs/{run.id}/finalize/",
+            {"confirm": True},
+            format="json",
+            HTTP_X_ACTIVE_COMPANY_ID=str(self.company.id),
+        )
+        self.assertEqual(finalize.status_code, status.HTTP_409_CONFLICT)
+
+    def test_async_generation_matches_synchronous_generation(self):
+        async_run = self._create_async_run()
+        self._run_all_chunks(async_run)
+        async_run.refresh_from_db()
+        async_items = list(PayrollRunItem.objects.filter(payroll_run=async_run).values_list(*ITEM_FIELDS))
+        async_payslips = list(
+            Payslip.objects.filter(payroll_run=async_run).values_list("employee_id", "total_deductions", "net_salary")
+        )
+
+        # Re-arm the same loans so the synchronous run sees identical inputs.
+        LoanRequest.objects.filter(pk__in=[loan.pk for loan in self.loans]).update(
+            status=LoanRequest.RequestStatus.APPROVED, deduction_payroll_run=None
+        )
+        sync_run = PayrollRun.objects.create(company=self.company, year=2026, month=6)
+        generate_payroll_items(sync_run)
+        sync_run.refresh_from_db()
+
+        self.assertEqual(async_run.status, PayrollRun.Status.DRAFT)
+        self.assertEqual(async_run.generation_processed, 5)
+        self.assertEqual(
+            async_items, list(PayrollRunItem.objects.filter(payroll_run=sync_run).values_list(*ITEM_FIELDS))
+        )
+        self.assertEqual(
+            async_payslips,
+            list(
+                Payslip.objects.filter(payroll_run=sync_run).values_list(
+                    "employee_id", "total_deductions", "net_salary"
+                )
+            ),
+        )
+        self.assertEqual(async_run.total_net, sync_run.total_net)
+        self.assertEqual(async_run.total_employees, sync_run.total_employees)
+
+    def test_replayed_chunk_does_not_deduct_twice(self):
+        run = self._create_async_run()
+        first_after = generate_payroll_chunk(run.id)
+        self.assertEqual(generate_payroll_chunk(run.id), first_after)
+        self._run_all_chunks(run)
+
+        self.assertEqual(PayrollRunItem.objects.filter(payroll_run=run).count(), 5)
+        self.assertEqual(Payslip.objects.filter(payroll_run=run).count(), 5)
+        self.assertEqual(
+            LoanRequest.objects.filter(deduction_payroll_run=run, status=LoanRequest.RequestStatus.DEDUCTED).count(),
+            len(self.loans),
+        )
+        self.assertEqual(
+            PayrollRunItem.objects.filter(payroll_run=run, total_deductions=Decimal("120.25")).count(),
+            len(self.loans),
+        )
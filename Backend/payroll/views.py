@@ -1,14 +1,11 @@
-import csv
-import io
+import logging
 from decimal import Decimal
 from html import escape
 
-import openpyxl
 from django.db import IntegrityError, transaction
-from django.db.models import Avg, Q, Sum
+from django.db.models import Avg, Sum
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
@@ -21,6 +18,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from audit.utils import audit
+from core.exporting import csv_response, xlsx_response
 from core.pagination import StandardPagination
 from core.pdf import (
     PALETTE,
@@ -48,12 +46,16 @@ from .serializers import (
     PayslipDetailSerializer,
     PayslipListSerializer,
 )
+from .services import generate_payroll_items, mark_generation_failed, payroll_employees_queryset
+from .tasks import generate_payroll_run_chunk
 from .throttles import (
     PayrollExportThrottle,
     PayrollFinalizeThrottle,
     PayrollGeneratePayslipsThrottle,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def _error_list(message, errors_list, status_code):
     return error(message, errors=errors_list, status=status_code)
@@ -410,14 +412,11 @@ def _export_payroll_run_response(request, run):
         or request.query_params.get("format")
         or "pdf"
     ).lower()
-    items = list(PayrollRunItem.objects.filter(payroll_run=run).order_by("employee_name", "id"))
+    items = PayrollRunItem.objects.filter(payroll_run=run).order_by("employee_name", "id")
 
     if export_format == "csv":
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = f'attachment; filename="payroll_run_{run.id}.csv"'
-        writer = csv.writer(response)
-        writer.writerow(
-            [
+        response = csv_response(
+            headers=[
                 "employee_id",
                 "employee_name",
                 "department",
@@ -426,10 +425,8 @@ def _export_payroll_run_response(request, run):
                 "allowances",
                 "deductions",
                 "net_salary",
-            ]
-        )
-        for item in items:
-            writer.writerow(
+            ],
+            rows=(
                 [
                     item.employee_id,
                     item.employee_name,
@@ -440,16 +437,16 @@ def _export_payroll_run_response(request, run):
                     str(item.total_deductions),
                     str(item.net_salary),
                 ]
-            )
+                for item in items.iterator(chunk_size=2000)
+            ),
+            filename=f"payroll_run_{run.id}.csv",
+        )
         audit(request, "payroll_exported_csv", entity="PayrollRun", entity_id=run.id)
         return response
 
     if export_format == "xlsx":
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Payroll"
-        ws.append(
-            [
+        response = xlsx_response(
+            headers=[
                 "Employee ID",
                 "Employee Name",
                 "Department",
@@ -458,10 +455,8 @@ def _export_payroll_run_response(request, run):
                 "Allowances",
                 "Deductions",
                 "Net Salary",
-            ]
-        )
-        for item in items:
-            ws.append(
+            ],
+            rows=(
                 [
                     item.employee_id,
                     item.employee_name,
@@ -472,21 +467,16 @@ def _export_payroll_run_response(request, run):
                     float(item.total_deductions),
                     float(item.net_salary),
                 ]
-            )
-
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        response = HttpResponse(
-            output.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                for item in items.iterator(chunk_size=2000)
+            ),
+            filename=f"payroll_run_{run.id}.xlsx",
+            sheet_name="Payroll",
         )
-        response["Content-Disposition"] = f'attachment; filename="payroll_run_{run.id}.xlsx"'
         audit(request, "payroll_exported_xlsx", entity="PayrollRun", entity_id=run.id)
         return response
 
     if export_format == "pdf":
-        pdf_bytes = _build_payroll_report_pdf(run, items)
+        pdf_bytes = _build_payroll_report_pdf(run, list(items))
         response = HttpResponse(pdf_bytes, content_type="application/pdf")
         response["Content-Disposition"] = f'attachment; filename="payroll_run_{run.id}.pdf"'
         response["Content-Length"] = str(len(pdf_bytes))
@@ -500,140 +490,33 @@ def _export_payroll_run_response(request, run):
     )
 
 
-def _generate_payroll_items(run, request=None):
-    """
-    Generates PayrollRunItems and Payslips for all active employees.
-    Calculates totals and updates the PayrollRun.
-    """
-    from employees.models import EmployeeProfile
-
-    # 1. Fetch active employees
-    employees = EmployeeProfile.objects.filter(
-        employment_status=EmployeeProfile.EmploymentStatus.ACTIVE,
-        is_archived=False,
-        company=run.company,
-    )
-
-    items_to_create = []
-    payslips_to_create = []
-
-    total_net_run = Decimal(0)
-    count = 0
-
-    for emp in employees:
-        # 2. Calculate components
-        basic = emp.basic_salary or Decimal(0)
-        transport = emp.transportation_allowance or Decimal(0)
-        accommodation = emp.accommodation_allowance or Decimal(0)
-        telephone = emp.telephone_allowance or Decimal(0)
-        petrol = emp.petrol_allowance or Decimal(0)
-        other = emp.other_allowance or Decimal(0)
-
-        total_allowances = transport + accommodation + telephone + petrol + other
-        gross_salary = basic + total_allowances
-
-        # Open-loan deduction policy:
-        # - Deduct in current payroll month target.
-        # - If target month was missed, deduct in the next available run (overdue carry-forward).
-        total_deductions = Decimal(0)
-        loan_to_deduct = None
-        if emp.user:
-            from loans.models import LoanRequest
-
-            due_for_run_q = (
-                Q(target_deduction_year__lt=run.year)
-                | Q(target_deduction_year=run.year, target_deduction_month__lte=run.month)
-                | Q(target_deduction_year__isnull=True, target_deduction_month__isnull=True)
-            )
-            loan_to_deduct = (
-                LoanRequest.objects.select_for_update()
-                .filter(
-                    employee=emp.user,
-                    status=LoanRequest.RequestStatus.APPROVED,
-                    deduction_payroll_run__isnull=True,
-                    is_active=True,
-                )
-                .filter(due_for_run_q)
-                .order_by("target_deduction_year", "target_deduction_month", "created_at")
-                .first()
-            )
-            if loan_to_deduct:
-                deduction_amount = loan_to_deduct.approved_amount or loan_to_deduct.requested_amount
-                total_deductions += deduction_amount
-
-        net_salary = gross_salary - total_deductions
-
-        # 3. Create Run Item
-        item = PayrollRunItem(
-            payroll_run=run,
-            employee_id=emp.employee_id,
-            employee_name=emp.full_name,
-            department=emp.department or "",
-            position=emp.job_title or "",
-            basic_salary=basic,
-            total_allowances=total_allowances,
-            total_deductions=total_deductions,
-            net_salary=net_salary,
+def _queue_payroll_generation(run, request):
+    try:
+        generate_payroll_run_chunk.apply_async(
+            args=[run.id],
+            kwargs={"actor_id": request.user.id if request.user.is_authenticated else None},
+            retry=False,
         )
-        items_to_create.append(item)
-
-        # 4. Persist deducted loan state
-        if loan_to_deduct:
-            loan_to_deduct.deduction_payroll_run = run
-            loan_to_deduct.deducted_at = timezone.now()
-            loan_to_deduct.deducted_amount = loan_to_deduct.approved_amount or loan_to_deduct.requested_amount
-            loan_to_deduct.status = loan_to_deduct.RequestStatus.DEDUCTED
-            loan_to_deduct.save(
-                update_fields=[
-                    "deduction_payroll_run",
-                    "deducted_at",
-                    "deducted_amount",
-                    "status",
-                    "updated_at",
-                ]
-            )
-            if request:
-                audit(
-                    request,
-                    "loan_deducted_in_payroll",
-                    entity="LoanRequest",
-                    entity_id=loan_to_deduct.id,
-                    metadata={"payroll_run_id": run.id, "amount": str(loan_to_deduct.deducted_amount)},
-                )
-
-        # 5. Create Payslip (if user linked)
-        if emp.user:
-            payslip = Payslip(
-                employee=emp.user,
-                payroll_run=run,
-                year=run.year,
-                month=run.month,
-                basic_salary=basic,
-                transportation_allowance=transport,
-                accommodation_allowance=accommodation,
-                telephone_allowance=telephone,
-                petrol_allowance=petrol,
-                other_allowance=other,
-                total_salary=gross_salary,
-                total_deductions=total_deductions,
-                net_salary=net_salary,
-                payment_mode="Bank Transfer",  # Default
-                status="PAID",  # Default for now
-                is_active=True,
-            )
-            payslips_to_create.append(payslip)
-
-        total_net_run += net_salary
-        count += 1
-
-    # Bulk create
-    PayrollRunItem.objects.bulk_create(items_to_create)
-    Payslip.objects.bulk_create(payslips_to_create)
-
-    # Update Run Totals
-    run.total_net = total_net_run
-    run.total_employees = count
-    run.save(update_fields=["total_net", "total_employees"])
+        return True
+    except Exception:
+        logger.exception("payroll_generation_queue_failed", extra={"payroll_run_id": run.id})
+        mark_generation_failed(run.id, "Payroll worker is unavailable.")
+        return False
+
+
+def _generation_progress_payload(run):
+    total = run.generation_total
+    processed = min(run.generation_processed, total) if total else run.generation_processed
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "processed": processed,
+        "total": total,
+        "percent": round(processed * 100 / total, 1)
+        if total
+        else (0.0 if run.status == PayrollRun.Status.GENERATING else 100.0),
+        "error": run.generation_error,
+    }
 
 
 class PayrollRunViewSet(
@@ -683,13 +566,20 @@ class PayrollRunViewSet(
                 _flatten_errors(serializer.errors),
                 status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
+        validated_data = dict(serializer.validated_data)
+        generation_mode = validated_data.pop("mode", "sync")
         try:
             with transaction.atomic():
-                run = PayrollRun.objects.create(company=company, **serializer.validated_data)
-                # Keep generation in the same DB transaction because it uses row locking
-                # for loan deductions (select_for_update).
-                _generate_payroll_items(run, request=request)
-                run.refresh_from_db()
+                if generation_mode == "async":
+                    run = PayrollRun(company=company, status=PayrollRun.Status.GENERATING, **validated_data)
+                    run.generation_total = payroll_employees_queryset(run).count()
+                    run.save()
+                else:
+                    run = PayrollRun.objects.create(company=company, **validated_data)
+                    # Keep generation in the same DB transaction because it uses row locking
+                    # for loan deductions (select_for_update).
+                    generate_payroll_items(run, request=request)
+                    run.refresh_from_db()
         except IntegrityError:
             return _error_list(
                 "Payroll run already exists.",
@@ -703,8 +593,18 @@ class PayrollRunViewSet(
                 status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        audit(request, "payroll_run_created", entity="PayrollRun", entity_id=run.id)
+        audit(
+            request,
+            "payroll_run_created",
+            entity="PayrollRun",
+            entity_id=run.id,
+            metadata={"mode": generation_mode} if generation_mode == "async" else None,
+        )
 
+        if generation_mode == "async":
+            _queue_payroll_generation(run, request)
+            run.refresh_from_db()
+            return success(PayrollRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
         return success(PayrollRunSerializer(run).data, status=status.HTTP_201_CREATED)
 
     def retrieve(self, request, *args, **kwargs):
@@ -734,6 +634,11 @@ class PayrollRunViewSet(
             }
         )
 
+    @action(detail=True, methods=["get"], url_path="progress")
+    def progress(self, request, pk=None):
+        run = self.get_object()
+        return success(_generation_progress_payload(run))
+
     @action(detail=True, methods=["get"], url_path="summary")
     def summary(self, request, pk=None):
         run = self.get_object()
@@ -793,6 +698,13 @@ class PayrollRunViewSet(
                 status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
 
+        if run.status in [PayrollRun.Status.GENERATING, PayrollRun.Status.FAILED]:
+            return _error_list(
+                "Payroll run is not ready.",
+                ["Wait for payroll generation to complete before finalizing."],
+                status.HTTP_409_CONFLICT,
+            )
+
         run.status = PayrollRun.Status.COMPLETED
         run.save(update_fields=["status", "updated_at"])
         audit(request, "payroll_run_finalized", entity="PayrollRun", entity_id=run.id)
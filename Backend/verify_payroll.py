@@ -10,7 +10,7 @@ from django.contrib.auth import get_user_model  # noqa: E402
 
 from employees.models import EmployeeProfile  # noqa: E402
 from payroll.models import PayrollRun, PayrollRunItem, Payslip  # noqa: E402
-from payroll.views import _generate_payroll_items  # noqa: E402
+from payroll.services import generate_payroll_items  # noqa: E402
 
 User = get_user_model()
 
@@ -63,7 +63,7 @@ def run_test():
 
     # 4. Generate Items
     print("Generating items...")
-    _generate_payroll_items(run)
+    generate_payroll_items(run)
 
     # 5. Verify
     run.refresh_from_db()